@@ -0,0 +1,237 @@
+import math
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import psutil
+except ImportError:  # optional, /proc/meminfo is used on Linux without it
+    psutil = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: running slots are then only bounded per process
+    fcntl = None
+
+# Rough peak RSS of one MediaPipe analysis, used to bound concurrency by memory
+ANALYSIS_MEM_BYTES = int(os.environ.get("ANALYSIS_MEM_MB", 600)) * 1024 ** 2
+CPU_SLOTS = int(os.environ.get("ANALYSIS_CPU_SLOTS", os.cpu_count() or 1))
+MAX_QUEUE = int(os.environ.get("ANALYSIS_MAX_QUEUE", 20))
+QUEUE_TIMEOUT_SEC = float(os.environ.get("ANALYSIS_QUEUE_TIMEOUT_SEC", 120))
+# Running slots are flock'ed files here, so app.py and api.py (and any extra
+# workers) share one host-wide bound of CPU_SLOTS. Rate limits and queue
+# depth are still tracked per process.
+SLOT_LOCK_DIR = os.environ.get("ANALYSIS_SLOT_LOCK_DIR", os.path.join(tempfile.gettempdir(), "sports_assessment_slots"))
+
+# Per-user token bucket: RATE_PER_MIN analyses a minute, bursts of up to RATE_BURST
+RATE_PER_MIN = float(os.environ.get("ANALYSIS_RATE_PER_MIN", 6))
+RATE_BURST = float(os.environ.get("ANALYSIS_RATE_BURST", 3))
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason, retry_after):
+        super().__init__(f"Analysis request rejected ({reason}), retry after {retry_after}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def available_memory():
+    """Bytes of memory available for new work, or None if it cannot be measured."""
+    if psutil is not None:
+        return psutil.virtual_memory().available
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+class HostSlots:
+    """Cross-process counting semaphore: one flock'ed file per slot."""
+
+    def __init__(self, count, lock_dir=SLOT_LOCK_DIR):
+        self.count = count
+        self.lock_dir = lock_dir
+        if fcntl is not None:
+            os.makedirs(lock_dir, exist_ok=True)
+
+    def try_acquire(self):
+        """Return a handle for a free slot, or None if all are held by any process."""
+        if fcntl is None:
+            return True  # per-process bound only
+        for i in range(self.count):
+            f = open(os.path.join(self.lock_dir, f"slot-{i}.lock"), "a")
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return f
+            except OSError:
+                f.close()
+        return None
+
+    def in_use(self):
+        """Slots currently held by any process on the host, 0 if that cannot be seen."""
+        if fcntl is None:
+            return 0
+        busy = 0
+        for i in range(self.count):
+            with open(os.path.join(self.lock_dir, f"slot-{i}.lock"), "a") as f:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    fcntl.flock(f, fcntl.LOCK_UN)
+                except OSError:
+                    busy += 1
+        return busy
+
+    def release(self, handle):
+        if fcntl is not None and handle is not None:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+            handle.close()
+
+
+class AdmissionController:
+    def __init__(self, cpu_slots=CPU_SLOTS, max_queue=MAX_QUEUE, rate_per_min=RATE_PER_MIN, burst=RATE_BURST,
+                 host_slots=None):
+        self.cpu_slots = max(cpu_slots, 1)
+        self.host_slots = host_slots or HostSlots(self.cpu_slots)
+        self.max_queue = max_queue
+        self.rate_per_sec = rate_per_min / 60.0
+        self.burst = burst
+        self.running = 0
+        self.queued = 0
+        self.avg_duration_sec = 30.0
+        self.counters = {"admitted": 0, "rejected_rate_limited": 0, "rejected_queue_full": 0, "rejected_timeout": 0}
+        self._buckets = {}  # key -> (tokens, last refill time)
+        self._cond = threading.Condition()
+
+    def check_rate(self, key):
+        """Take one token from `key`'s bucket or raise AdmissionRejected."""
+        if self.rate_per_sec <= 0:
+            return  # rate limiting disabled
+        now = time.monotonic()
+        with self._cond:
+            tokens, last = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate_per_sec)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                self.counters["rejected_rate_limited"] += 1
+                raise AdmissionRejected("rate_limited", math.ceil((1 - tokens) / self.rate_per_sec))
+            self._buckets[key] = (tokens - 1, now)
+            if len(self._buckets) > 10000:
+                self._prune_buckets(now)
+
+    def ensure_capacity(self):
+        """Reject early, e.g. before saving an upload, when the queue is already full."""
+        with self._cond:
+            if self.queued >= self.max_queue:
+                self.counters["rejected_queue_full"] += 1
+                raise AdmissionRejected("queue_full", self._retry_after())
+
+    def reserve(self):
+        """
+        Take a queue place now for work that will call slot(reserved=True)
+        later, e.g. a background job whose client already got a 202.
+        Raises AdmissionRejected if the queue is full.
+        """
+        with self._cond:
+            if self.queued >= self.max_queue:
+                self.counters["rejected_queue_full"] += 1
+                raise AdmissionRejected("queue_full", self._retry_after())
+            self.queued += 1
+
+    def cancel_reservation(self):
+        with self._cond:
+            self.queued -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def slot(self, timeout=QUEUE_TIMEOUT_SEC, reserved=False):
+        """
+        Hold one analysis slot while the block runs, queueing until CPU and
+        memory allow another analysis. Raises AdmissionRejected if the queue
+        is full or no slot frees up within `timeout` seconds (None waits forever).
+        With `reserved=True` the queue place taken by reserve() is used, so the
+        queue-full check cannot fail.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        handle = None
+        with self._cond:
+            if not reserved:
+                if self.queued >= self.max_queue:
+                    self.counters["rejected_queue_full"] += 1
+                    raise AdmissionRejected("queue_full", self._retry_after())
+                self.queued += 1
+            try:
+                while True:
+                    if self._can_start():
+                        handle = self.host_slots.try_acquire()
+                        if handle is not None:
+                            break
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self.counters["rejected_timeout"] += 1
+                        raise AdmissionRejected("timeout", self._retry_after())
+                    # Memory and other processes' slots free up without a notify, so re-check periodically
+                    self._cond.wait(1.0 if remaining is None else min(remaining, 1.0))
+            finally:
+                self.queued -= 1
+            self.running += 1
+            self.counters["admitted"] += 1
+
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.host_slots.release(handle)
+            with self._cond:
+                self.running -= 1
+                self.avg_duration_sec = 0.8 * self.avg_duration_sec + 0.2 * (time.monotonic() - start)
+                self._cond.notify()
+
+    def depth(self):
+        """
+        Analyses queued or running besides the caller's own: this process's
+        queue plus every running slot on the host. Used to pick the model tier
+        from inside a slot.
+        """
+        with self._cond:
+            queued, running = self.queued, self.running
+        running = max(running, self.host_slots.in_use())
+        return max(queued + running - 1, 0)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "running": self.running,
+                "queued": self.queued,
+                "cpu_slots": self.cpu_slots,
+                "max_queue": self.max_queue,
+                "available_memory_mb": (available_memory() or 0) // 1024 ** 2,
+                "avg_duration_sec": round(self.avg_duration_sec, 1),
+                **self.counters,
+            }
+
+    def _can_start(self):
+        if self.running >= self.cpu_slots:
+            return False
+        if self.running == 0:
+            return True  # always let one analysis through
+        mem = available_memory()
+        return mem is None or mem >= ANALYSIS_MEM_BYTES
+
+    def _retry_after(self):
+        waves = (self.queued + self.running) / self.cpu_slots
+        return max(1, math.ceil(waves * self.avg_duration_sec))
+
+    def _prune_buckets(self, now):
+        # Buckets that have refilled completely carry no state
+        full_after = self.burst / self.rate_per_sec if self.rate_per_sec > 0 else float("inf")
+        for key in [k for k, (_, last) in self._buckets.items() if now - last > full_after]:
+            del self._buckets[key]
+
+
+admission = AdmissionController()
@@ -0,0 +1,108 @@
+from pushup_counter import analyze_pushups
+from vertical_jump_max_height import analyze_jump
+from boxing import analyze_punching_speed
+from squad import analyze_squad
+from fingerprints import analysis_key, find_duplicate, remember_result, video_fingerprint
+from model_tiers import MODEL_TIERS, choose_tier, count_frames
+from storage import analysis_source, discard_upload, is_stored
+
+# Target wall-clock time for one analysis, used to pick the model tier
+LATENCY_BUDGET_SEC = 30.0
+
+
+def check_duplicate(test_type, video_path, user_id, height_cm=170):
+    """
+    Fingerprint an upload and answer it from the cache if it is a
+    near-duplicate of the same athlete's earlier upload. The duplicate file
+    is deleted and nothing new is saved, so re-uploads do not inflate the
+    leaderboard. Cheap, so callers run it before waiting for an admission slot.
+
+    Returns:
+        tuple: (analysis, fingerprint). analysis is a run_analysis() result
+        for a duplicate, else None; pass fingerprint on to run_analysis().
+    """
+    key = analysis_key(user_id, test_type, height_cm)
+    hashes, duration_sec = video_fingerprint(video_path)
+    fingerprint = (key, hashes, duration_sec)
+    cached = find_duplicate(key, hashes, duration_sec)
+    if not cached:
+        return None, fingerprint
+    if cached["video_path"] != video_path and is_stored(cached["video_path"]):
+        discard_upload(video_path)
+    print(f"✅ Duplicate of {cached['video_path']}, returning cached result")
+    return {"test_type": test_type, "model_tier": cached["model_tier"], "result": cached["result"],
+            "findings": cached["findings"], "duplicate_of": cached["video_path"]}, fingerprint
+
+
+def run_analysis(test_type, video_path, user_id, height_cm=170, latency_budget_sec=LATENCY_BUDGET_SEC,
+                 fingerprint=None):
+    """
+    Run the analyzer for `test_type` on an uploaded video and save the result.
+
+    Pass the fingerprint from check_duplicate() when the duplicate check
+    already ran outside the admission slot; without it the check runs here.
+    The low-res proxy is decoded, while results keep pointing at the original upload.
+
+    Returns:
+        dict: {
+            "test_type": str,
+            "model_tier": str,
+            "result": int/float/dict,
+            "findings": str,
+            "duplicate_of": str or None
+        }
+    """
+    if fingerprint is None:
+        cached, fingerprint = check_duplicate(test_type, video_path, user_id, height_cm)
+        if cached:
+            return cached
+    key, hashes, duration_sec = fingerprint
+
+    source = analysis_source(video_path)
+    tier = choose_tier(count_frames(source), latency_budget_sec)
+    complexity = MODEL_TIERS[tier]
+
+    if test_type == "pushups":
+        result = analyze_pushups(source, user_id, show_video=False, model_complexity=complexity,
+                                 save_as=video_path)
+        findings = f"Total Push-ups: {result}"
+    elif test_type == "jump":
+        result = analyze_jump(source, user_height_cm=height_cm, user_id=user_id, show_video=False,
+                              model_complexity=complexity, save_as=video_path)
+        findings = f"Vertical Jump Height: {result:.2f} cm"
+    else:  # punches
+        result = analyze_punching_speed(source, user_id=user_id, hand="RIGHT", show=False,
+                                        model_complexity=complexity, save_as=video_path)
+        findings = f"Total Punches: {result['total_punches']}\nDuration: {result['duration_sec']:.2f}s\nPunches/sec: {result['punches_per_sec']:.2f}\nPunches/min: {result['punches_per_min']:.2f}"
+
+    findings += f"\nModel: {tier}"
+    remember_result(key, hashes, duration_sec, video_path, result, findings, tier)
+    return {"test_type": test_type, "model_tier": tier, "result": result, "findings": findings, "duplicate_of": None}
+
+
+def run_squad_analysis(test_type, video_path, user_ids, heights_cm=None, latency_budget_sec=LATENCY_BUDGET_SEC):
+    """
+    Score a whole squad from one video and save a result for each mapped user.
+    Raises squad.SquadMismatch, saving nothing, if the athletes found in the
+    video do not match the roster.
+
+    Returns:
+        dict: {"test_type", "model_tier", "results", "findings"}
+    """
+    source = analysis_source(video_path)
+    # Every athlete costs a pose pass per frame
+    tier = choose_tier(count_frames(source) * max(len(user_ids), 1), latency_budget_sec)
+
+    results = analyze_squad(source, test_type, user_ids, heights_cm=heights_cm,
+                            model_complexity=MODEL_TIERS[tier], save_as=video_path)
+
+    lines = []
+    for r in results:
+        if test_type == "pushups":
+            lines.append(f"Athlete {r['user_id']}: {r['result']} push-ups")
+        elif test_type == "jump":
+            lines.append(f"Athlete {r['user_id']}: {r['result']:.2f} cm")
+        else:
+            lines.append(f"Athlete {r['user_id']}: {r['result']['total_punches']} punches ({r['result']['punches_per_min']:.2f}/min)")
+    lines.append(f"Model: {tier}")
+    return {"test_type": test_type, "model_tier": tier, "results": results, "findings": "\n".join(lines)}
@@ -0,0 +1,181 @@
+import asyncio
+import json
+import math
+import os
+from functools import wraps
+from quart import Quart, Response, jsonify, request, session
+from admission import AdmissionRejected, admission
+from db_utils import LEADERBOARD_TABLES, fetch_leaderboard
+from model_tiers import start_benchmark
+from jobs import create_job, get_job, submit_analysis, wait_for_update
+from storage import UPLOAD_DIR, discard_upload, ingest_upload, new_upload_path, start_maintenance_thread
+
+# JSON API served by an ASGI server, e.g. `hypercorn api:app --bind 0.0.0.0:8000`.
+# Uploads, long-polls and DB calls never block the event loop: file I/O is
+# awaited, analysis runs on the job executor and MySQL calls on worker threads.
+app = Quart(__name__)
+app.config["UPLOAD_FOLDER"] = UPLOAD_DIR
+app.config["MAX_CONTENT_LENGTH"] = 500 * 1024 * 1024
+app.config["BODY_TIMEOUT"] = 600  # slow mobile uploads
+os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
+app.secret_key = "supersecretkey"  # same key as app.py so the login cookie is shared
+
+TEST_TYPES = ("pushups", "jump", "punches")
+MAX_WAIT_SEC = 60
+
+start_maintenance_thread()
+# Jobs run in this process, so it loads the host's tier benchmark too (see app.py)
+start_benchmark()
+
+
+class InvalidParameter(ValueError):
+    pass
+
+
+def number_param(values, name, default, cast=float, minimum=None):
+    """Read a numeric form/query value, raising InvalidParameter (400) if it is malformed."""
+    raw = values.get(name)
+    if raw is None or raw == "":
+        return default
+    try:
+        value = cast(raw)
+    except (TypeError, ValueError):
+        raise InvalidParameter(f"{name} must be a {'number' if cast is float else 'whole number'}")
+    if not math.isfinite(value):
+        raise InvalidParameter(f"{name} must be finite")
+    if minimum is not None and value < minimum:
+        raise InvalidParameter(f"{name} must be at least {minimum}")
+    return value
+
+
+# Same rules as app.login_required, answered with JSON status codes instead of redirects
+def api_login_required(role=None):
+    def wrapper(fn):
+        @wraps(fn)
+        async def decorated_view(*args, **kwargs):
+            if "user_id" not in session:
+                return jsonify({"error": "login required"}), 401
+            if role and session.get("role") != role:
+                return jsonify({"error": f"{role} account required"}), 403
+            return await fn(*args, **kwargs)
+        return decorated_view
+    return wrapper
+
+
+@app.errorhandler(AdmissionRejected)
+async def admission_rejected(exc):
+    response = jsonify({"error": str(exc), "reason": exc.reason, "retry_after": exc.retry_after})
+    response.status_code = 429
+    response.headers["Retry-After"] = str(exc.retry_after)
+    return response
+
+
+@app.errorhandler(InvalidParameter)
+async def invalid_parameter(exc):
+    return jsonify({"error": str(exc)}), 400
+
+
+def job_json(job):
+    return {k: job[k] for k in ("job_id", "status", "version", "test_type", "findings", "model_tier", "error")}
+
+
+# ✅ Submit a video, returns immediately with a job id
+@app.route("/api/videos", methods=["POST"])
+@api_login_required(role="Player")
+async def submit_video():
+    # Reject before reading the upload body
+    admission.check_rate(f"user:{session['user_id']}")
+    admission.ensure_capacity()
+
+    form = await request.form
+    files = await request.files
+    test_type = form.get("test_type")
+    if test_type not in TEST_TYPES:
+        return jsonify({"error": f"test_type must be one of {', '.join(TEST_TYPES)}"}), 400
+    if "video" not in files:
+        return jsonify({"error": "video file is required"}), 400
+
+    height_cm = number_param(form, "height_cm", 170, minimum=50)
+    video = files["video"]
+    video_path = new_upload_path(video.filename)
+    await video.save(video_path)
+
+    # Hold the job's queue place only once the upload is in, so slow uploads
+    # never fill the queue; the job thread takes the reservation over
+    try:
+        admission.reserve()
+    except AdmissionRejected:
+        discard_upload(video_path)
+        raise
+    try:
+        ingest_upload(video_path)
+        job_id = create_job(session["user_id"], test_type, video_path)
+        submit_analysis(job_id, height_cm=height_cm)
+    except BaseException:
+        admission.cancel_reservation()
+        raise
+    return jsonify(job_json(get_job(job_id))), 202
+
+
+# ✅ Job status; pass ?wait=<sec>&version=<n> to long-poll for the next change
+@app.route("/api/jobs/<job_id>")
+@api_login_required()
+async def job_status(job_id):
+    job = get_job(job_id)
+    if job is None or job["user_id"] != session["user_id"]:
+        return jsonify({"error": "job not found"}), 404
+
+    wait = min(number_param(request.args, "wait", 0, minimum=0), MAX_WAIT_SEC)
+    if wait > 0:
+        version = number_param(request.args, "version", job["version"], cast=int, minimum=0)
+        job = await wait_for_update(job_id, version, wait)
+    return jsonify(job_json(job))
+
+
+# ✅ Job status as a server-sent event stream, closes when the job finishes
+@app.route("/api/jobs/<job_id>/events")
+@api_login_required()
+async def job_events(job_id):
+    job = get_job(job_id)
+    if job is None or job["user_id"] != session["user_id"]:
+        return jsonify({"error": "job not found"}), 404
+
+    async def stream():
+        current = job
+        while True:
+            yield f"data: {json.dumps(job_json(current))}\n\n".encode()
+            if current["status"] in ("done", "failed"):
+                break
+            current = await wait_for_update(job_id, current["version"], MAX_WAIT_SEC)
+            if current is None:
+                break
+
+    response = Response(stream(), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.timeout = None
+    return response
+
+
+# ✅ Admission queue depth and rejection counts, for sizing the deployment
+@app.route("/api/admission")
+async def admission_stats():
+    return jsonify(admission.stats())
+
+
+# ✅ Leaderboard page for one test type
+@app.route("/api/leaderboard/<test_type>")
+@api_login_required(role="Coach")
+async def leaderboard_page(test_type):
+    if test_type not in LEADERBOARD_TABLES:
+        return jsonify({"error": "unknown test type"}), 404
+    page = number_param(request.args, "page", 1, cast=int, minimum=1)
+    per_page = min(number_param(request.args, "per_page", 20, cast=int, minimum=1), 100)
+
+    rows = await asyncio.to_thread(fetch_leaderboard, test_type, page, per_page)
+    for row in rows:
+        row["analyzed_at"] = row["analyzed_at"].isoformat() if row["analyzed_at"] else None
+    return jsonify({"test_type": test_type, "page": page, "per_page": per_page, "results": rows})
+
+
+if __name__ == "__main__":
+    app.run(debug=True)
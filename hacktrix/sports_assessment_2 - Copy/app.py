@@ -1,16 +1,25 @@
 import os
-from flask import Flask, render_template, request, redirect, url_for, session, flash
+from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
+from admission import AdmissionRejected, admission
 from db_utils import get_connection
-from pushup_counter import analyze_pushups
-from vertical_jump_max_height import analyze_jump
-from boxing import analyze_punching_speed
+from analysis import check_duplicate, run_analysis, run_squad_analysis
+from model_tiers import start_benchmark
+from squad import InvalidRoster, SquadMismatch, check_roster
+from storage import UPLOAD_DIR, ingest_upload, new_upload_path, start_maintenance_thread
 from werkzeug.security import generate_password_hash, check_password_hash
 from functools import wraps
 app = Flask(__name__)
-app.config["UPLOAD_FOLDER"] = "static/uploads"
+app.config["UPLOAD_FOLDER"] = UPLOAD_DIR
 os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
 app.secret_key = "supersecretkey"
 
+# ✅ archive cold uploads and enforce the disk quota in the background
+start_maintenance_thread()
+
+# ✅ benchmark lite/full/heavy pose models once per host, shared with api.py
+# (REFERENCE_CLIP env var, or the most recent stored upload)
+start_benchmark()
+
 # ✅ helper: require login
 def login_required(role=None):
     def wrapper(fn):
@@ -28,6 +37,15 @@ def login_required(role=None):
         return decorated_view
     return wrapper
 
+# ✅ too many analyses: tell the client when to come back
+@app.errorhandler(AdmissionRejected)
+def admission_rejected(exc):
+    return f"⏳ Server busy ({exc.reason}). Please retry in {exc.retry_after} seconds.", 429, {"Retry-After": str(exc.retry_after)}
+
+@app.route("/admission_stats")
+def admission_stats():
+    return jsonify(admission.stats())
+
 # ✅ Sign Up Page
 @app.route("/signup", methods=["GET", "POST"])
 def signup():
@@ -117,6 +135,10 @@ def analyze_v_up_form():
 @app.route("/analyze_v_up", methods=["POST"])
 @login_required(role="Player")
 def analyze_v_up():
+    # Reject before touching request.form, which parses the whole upload
+    admission.check_rate(f"user:{session['user_id']}")
+    admission.ensure_capacity()
+
     name = session["name"]
     user_id = session["user_id"]
     height_cm = float(request.form["height_cm"]) if "height_cm" in request.form else 170
@@ -125,23 +147,26 @@ def analyze_v_up():
 
     # Save video
     video = request.files["video"]
-    video_path = os.path.join(app.config["UPLOAD_FOLDER"], video.filename)
+    video_path = new_upload_path(video.filename)
     video.save(video_path)
+    ingest_upload(video_path)
 
-    # Run analysis
-    if test_type == "pushups":
-        findings = f"Total Push-ups: {analyze_pushups(video_path, user_id, show_video=False)}"
-    elif test_type == "jump":
-        findings = f"Vertical Jump Height: {analyze_jump(video_path, user_height_cm=height_cm, user_id=user_id, show_video=False):.2f} cm"
-    else:
-        result = analyze_punching_speed(video_path, user_id=user_id, hand="RIGHT", show=False)
-        findings = f"Total Punches: {result['total_punches']}\nDuration: {result['duration_sec']:.2f}s\nPunches/sec: {result['punches_per_sec']:.2f}\nPunches/min: {result['punches_per_min']:.2f}"
+    # Run analysis; duplicates return the cached result without waiting for a slot
+    analysis, fingerprint = check_duplicate(test_type, video_path, user_id, height_cm)
+    if analysis is None:
+        with admission.slot():
+            analysis = run_analysis(test_type, video_path, user_id, height_cm=height_cm, fingerprint=fingerprint)
+    findings = analysis["findings"]
 
     return render_template("results.html", user=session, test_type=test_type, findings=findings)
 
 
 @app.route("/analyze", methods=["POST"])
 def analyze():
+    # Unauthenticated, so rate limit by client address
+    admission.check_rate(f"ip:{request.remote_addr}")
+    admission.ensure_capacity()
+
     name = request.form["name"]
     age = int(request.form["age"])
     height_cm = float(request.form["height_cm"])
@@ -153,22 +178,61 @@ def analyze():
 
     # Save video
     video = request.files["video"]
-    video_path = os.path.join(app.config["UPLOAD_FOLDER"], video.filename)
+    video_path = new_upload_path(video.filename)
     video.save(video_path)
+    ingest_upload(video_path)
 
-    # Run analysis
-    if test_type == "pushups":
-        findings = f"Total Push-ups: {analyze_pushups(video_path, user_id, show_video=False)}"
-    elif test_type == "jump":
-        findings = f"Vertical Jump Height: {analyze_jump(video_path, user_height_cm=height_cm, user_id=user_id, show_video=False):.2f} cm"
-    else:  # punches
-        result = analyze_punching_speed(video_path, user_id=user_id, hand="RIGHT", show=False)
-        findings = f"Total Punches: {result['total_punches']}\nDuration: {result['duration_sec']:.2f}s\nPunches/sec: {result['punches_per_sec']:.2f}\nPunches/min: {result['punches_per_min']:.2f}"
+    # Run analysis; duplicates return the cached result without waiting for a slot
+    analysis, fingerprint = check_duplicate(test_type, video_path, user_id, height_cm)
+    if analysis is None:
+        with admission.slot():
+            analysis = run_analysis(test_type, video_path, user_id, height_cm=height_cm, fingerprint=fingerprint)
+    findings = analysis["findings"]
 
     # Send results to frontend
     user = {"name": name, "age": age, "height_cm": height_cm, "weight_kg": weight_kg}
     return render_template("results.html", user=user, test_type=test_type, findings=findings)
 
+@app.route("/analyze_squad_form")
+@login_required(role="Coach")
+def analyze_squad_form():
+    return render_template("analyze_squad.html", user=session)
+
+@app.route("/analyze_squad", methods=["POST"])
+@login_required(role="Coach")
+def analyze_squad():
+    admission.check_rate(f"user:{session['user_id']}")
+    admission.ensure_capacity()
+
+    test_type = request.form["test_type"]
+    try:
+        user_ids = [int(u) for u in request.form["user_ids"].replace(" ", "").split(",") if u]
+    except ValueError:
+        flash("❌ Athlete IDs must be numbers separated by commas")
+        return redirect(url_for("analyze_squad_form"))
+    # Check the roster before saving the upload, not after minutes of analysis
+    try:
+        heights_cm = check_roster(user_ids)
+    except InvalidRoster as exc:
+        flash(f"❌ {exc}")
+        return redirect(url_for("analyze_squad_form"))
+
+    # Save video
+    video = request.files["video"]
+    video_path = new_upload_path(video.filename)
+    video.save(video_path)
+    ingest_upload(video_path)
+
+    # Run analysis for every athlete in the video
+    try:
+        with admission.slot():
+            findings = run_squad_analysis(test_type, video_path, user_ids, heights_cm=heights_cm)["findings"]
+    except SquadMismatch as exc:
+        flash(f"❌ {exc}. Nothing was saved; make sure every athlete stands upright and visible at the start.")
+        return redirect(url_for("analyze_squad_form"))
+
+    return render_template("results.html", user=session, test_type=test_type, findings=findings)
+
 @app.route("/leaderboard")
 @login_required(role="Coach")
 def leaderboard():
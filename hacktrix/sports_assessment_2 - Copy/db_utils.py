@@ -1,4 +1,23 @@
+import threading
 import mysql.connector
+import mysql.connector.pooling
+
+# MySQLConnectionPool raises PoolError instead of waiting when it is empty,
+# so borrowers queue on this semaphore first
+POOL_SIZE = 10
+POOL_WAIT_SEC = 30
+_pool = None
+_pool_lock = threading.Lock()
+_pool_slots = threading.BoundedSemaphore(POOL_SIZE)
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+# test_type -> (table, score column)
+LEADERBOARD_TABLES = {
+    "pushups": ("pushups", "total_pushups"),
+    "jump": ("vertical_jumps", "jump_height_cm"),
+    "punches": ("punches", "total_punches"),
+}
 
 def create_database_and_tables():
     conn = mysql.connector.connect(
@@ -34,6 +53,7 @@ def create_database_and_tables():
             user_id INT,
             video_path VARCHAR(255),
             total_pushups INT,
+            model_tier VARCHAR(10) DEFAULT 'full',
             analyzed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (user_id) REFERENCES users(user_id)
         )
@@ -46,6 +66,7 @@ def create_database_and_tables():
             user_id INT,
             video_path VARCHAR(255),
             jump_height_cm FLOAT,
+            model_tier VARCHAR(10) DEFAULT 'full',
             analyzed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (user_id) REFERENCES users(user_id)
         )
@@ -60,18 +81,59 @@ def create_database_and_tables():
             duration_sec FLOAT,
             punches_per_sec FLOAT,
             punches_per_min FLOAT,
+            model_tier VARCHAR(10) DEFAULT 'full',
             analyzed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (user_id) REFERENCES users(user_id)
         )
     """)
 
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS video_fingerprints (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            analysis_key VARCHAR(32),
+            video_path VARCHAR(255),
+            frame_hashes TEXT,
+            duration_sec FLOAT,
+            result_json TEXT,
+            findings TEXT,
+            model_tier VARCHAR(10),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Tables created before model tiers were recorded
+    for table in ("pushups", "vertical_jumps", "punches"):
+        add_column_if_missing(cursor, table, "model_tier", "VARCHAR(10) DEFAULT 'full'")
+    add_column_if_missing(cursor, "video_fingerprints", "duration_sec", "FLOAT")
+
     conn.commit()
     cursor.close()
     conn.close()
 
 
+def add_column_if_missing(cursor, table, column, definition):
+    cursor.execute(
+        """
+        SELECT COUNT(*) FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+        """,
+        (table, column)
+    )
+    if cursor.fetchone()[0] == 0:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def ensure_schema():
+    """Create the database, tables and column migrations once per process."""
+    global _schema_ready
+    with _schema_lock:
+        if not _schema_ready:
+            create_database_and_tables()
+            _schema_ready = True
+
+
 def get_connection():
-    create_database_and_tables()
+    ensure_schema()
     return mysql.connector.connect(
         host="localhost",
         user="root",
@@ -80,41 +142,207 @@ def get_connection():
     )
 
 
-def save_pushup_result(user_id, video_path, total_pushups):
+class _PooledLease:
+    """A pooled connection whose close() also frees its place in the pool."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, attr):
+        return getattr(self._conn, attr)
+
+    def close(self):
+        if self._conn is None:
+            return
+        try:
+            self._conn.close()
+        finally:
+            self._conn = None
+            _pool_slots.release()
+
+
+def get_pooled_connection(timeout=POOL_WAIT_SEC):
+    """
+    Borrow a connection from a shared pool; close() hands it back.
+
+    Saves opening a new MySQL connection per call, so this is cheap enough
+    to call from request handlers. When all POOL_SIZE connections are lent
+    out, waits up to `timeout` seconds for one to come back.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            ensure_schema()
+            _pool = mysql.connector.pooling.MySQLConnectionPool(
+                pool_name="sports_assessment",
+                pool_size=POOL_SIZE,
+                host="localhost",
+                user="root",
+                password="sql123",
+                database="sports_assessment"
+            )
+    if not _pool_slots.acquire(timeout=timeout):
+        raise mysql.connector.errors.PoolError(f"No pooled connection freed up within {timeout}s")
+    try:
+        return _PooledLease(_pool.get_connection())
+    except Exception:
+        _pool_slots.release()
+        raise
+
+
+def fetch_leaderboard(test_type, page=1, per_page=20):
+    table, column = LEADERBOARD_TABLES[test_type]
+    conn = get_pooled_connection()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
+            f"""
+            SELECT u.name, t.{column} AS score, t.model_tier, t.analyzed_at
+            FROM {table} t JOIN users u ON t.user_id = u.user_id
+            ORDER BY t.{column} DESC, t.id
+            LIMIT %s OFFSET %s
+            """,
+            (per_page, (page - 1) * per_page)
+        )
+        rows = cursor.fetchall()
+        cursor.close()
+    finally:
+        conn.close()
+    return rows
+
+
+def save_pushup_result(user_id, video_path, total_pushups, model_tier="full"):
     conn = get_connection()
     cursor = conn.cursor()
     query = """
-        INSERT INTO pushups (user_id, video_path, total_pushups)
-        VALUES (%s, %s, %s)
+        INSERT INTO pushups (user_id, video_path, total_pushups, model_tier)
+        VALUES (%s, %s, %s, %s)
     """
-    cursor.execute(query, (user_id, video_path, total_pushups))
+    cursor.execute(query, (user_id, video_path, total_pushups, model_tier))
     conn.commit()
     cursor.close()
     conn.close()
 
 
-def save_jump_result(user_id, video_path, jump_height_cm):
+def save_jump_result(user_id, video_path, jump_height_cm, model_tier="full"):
     conn = get_connection()
     cursor = conn.cursor()
     query = """
-        INSERT INTO vertical_jumps (user_id, video_path, jump_height_cm)
-        VALUES (%s, %s, %s)
+        INSERT INTO vertical_jumps (user_id, video_path, jump_height_cm, model_tier)
+        VALUES (%s, %s, %s, %s)
     """
-    cursor.execute(query, (user_id, video_path, jump_height_cm))
+    cursor.execute(query, (user_id, video_path, jump_height_cm, model_tier))
     conn.commit()
     cursor.close()
     conn.close()
 
 
-def save_punch_result(user_id, video_path, total_punches, duration_sec, punches_per_sec, punches_per_min):
+def save_punch_result(user_id, video_path, total_punches, duration_sec, punches_per_sec, punches_per_min, model_tier="full"):
     conn = get_connection()
     cursor = conn.cursor()
     query = """
-        INSERT INTO punches (user_id, video_path, total_punches, duration_sec, punches_per_sec, punches_per_min)
-        VALUES (%s, %s, %s, %s, %s, %s)
+        INSERT INTO punches (user_id, video_path, total_punches, duration_sec, punches_per_sec, punches_per_min, model_tier)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
     """
-    cursor.execute(query, (user_id, video_path, total_punches, duration_sec, punches_per_sec, punches_per_min))
+    cursor.execute(query, (user_id, video_path, total_punches, duration_sec, punches_per_sec, punches_per_min, model_tier))
     conn.commit()
     cursor.close()
     conn.close()
 
+
+def save_fingerprint(analysis_key, video_path, frame_hashes, duration_sec, result_json, findings, model_tier):
+    conn = get_pooled_connection()
+    try:
+        cursor = conn.cursor()
+        query = """
+            INSERT INTO video_fingerprints (analysis_key, video_path, frame_hashes, duration_sec, result_json, findings, model_tier)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """
+        cursor.execute(query, (analysis_key, video_path, frame_hashes, duration_sec, result_json, findings, model_tier))
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def load_fingerprints(after_id=0):
+    conn = get_pooled_connection()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("""
+            SELECT id, analysis_key, video_path, frame_hashes, duration_sec, result_json, findings, model_tier
+            FROM video_fingerprints WHERE id > %s ORDER BY id
+        """, (after_id,))
+        rows = cursor.fetchall()
+        cursor.close()
+    finally:
+        conn.close()
+    return rows
+
+
+def get_users(user_ids):
+    """user_id -> {"user_id", "role", "height_cm"} for the ids that exist."""
+    if not user_ids:
+        return {}
+    conn = get_connection()
+    cursor = conn.cursor(dictionary=True)
+    placeholders = ", ".join(["%s"] * len(user_ids))
+    cursor.execute(f"SELECT user_id, role, height_cm FROM users WHERE user_id IN ({placeholders})", tuple(user_ids))
+    users = {row["user_id"]: row for row in cursor.fetchall()}
+    cursor.close()
+    conn.close()
+    return users
+
+
+def save_squad_results(test_type, video_path, results, model_tier="full"):
+    """
+    Save one row per athlete of a squad video in a single transaction, so
+    either every athlete's result is saved or none is.
+
+    Args:
+        results (list): [(user_id, result)] with results shaped like the single-athlete analyzers return.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        for user_id, result in results:
+            if test_type == "pushups":
+                cursor.execute(
+                    "INSERT INTO pushups (user_id, video_path, total_pushups, model_tier) VALUES (%s, %s, %s, %s)",
+                    (user_id, video_path, result, model_tier)
+                )
+            elif test_type == "jump":
+                cursor.execute(
+                    "INSERT INTO vertical_jumps (user_id, video_path, jump_height_cm, model_tier) VALUES (%s, %s, %s, %s)",
+                    (user_id, video_path, result, model_tier)
+                )
+            else:
+                cursor.execute(
+                    """
+                    INSERT INTO punches (user_id, video_path, total_punches, duration_sec, punches_per_sec, punches_per_min, model_tier)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                    """,
+                    (user_id, video_path, result["total_punches"], result["duration_sec"],
+                     result["punches_per_sec"], result["punches_per_min"], model_tier)
+                )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def rename_video_paths(old_prefix, new_prefix):
+    """Repoint result rows after uploads were moved to another directory."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    for table in ("pushups", "vertical_jumps", "punches", "video_fingerprints"):
+        cursor.execute(
+            f"UPDATE {table} SET video_path = CONCAT(%s, SUBSTRING(video_path, %s)) WHERE LEFT(video_path, %s) = %s",
+            (new_prefix, len(old_prefix) + 1, len(old_prefix), old_prefix)
+        )
+    conn.commit()
+    cursor.close()
+    conn.close()
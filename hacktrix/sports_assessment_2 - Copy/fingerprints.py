@@ -0,0 +1,143 @@
+import json
+import threading
+import cv2
+import numpy as np
+from db_utils import load_fingerprints, save_fingerprint
+
+SAMPLE_FRAMES = 16
+BANDS = 4  # each 64-bit frame hash is indexed as 4 x 16-bit bands
+BAND_BITS = 64 // BANDS
+MAX_MEAN_DISTANCE = 4  # average differing bits per sampled frame for a near-duplicate
+# Re-encodes keep the clip length; a different attempt almost never matches it this closely
+DURATION_TOLERANCE_SEC = 0.25
+
+_lock = threading.Lock()
+_entries = []  # id -> {"analysis_key", "video_path", "hashes", "duration_sec", "result", "findings", "model_tier"}
+_buckets = {}  # (analysis_key, sample, band, band value) -> [entry ids]
+_last_row_id = 0  # highest video_fingerprints.id already indexed
+
+
+def dhash(frame):
+    """64-bit difference hash of a BGR frame."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def video_fingerprint(video_path, samples=SAMPLE_FRAMES):
+    """
+    Hash `samples` frames spread evenly over the video.
+
+    Positions are relative to the clip length, so a re-encode at another
+    resolution or frame rate samples the same moments. When the container
+    does not report a frame count (common for WebM) the whole clip is read
+    sequentially, hashing every frame and keeping the evenly spaced ones.
+
+    Returns:
+        tuple: (hashes, duration_sec). One 64-bit dHash per sample, None for
+        frames that could not be read; duration is 0 if it is unknown.
+    """
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    if total > 0:
+        hashes = []
+        for i in range(samples):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int((i + 0.5) * total / samples))
+            ret, frame = cap.read()
+            hashes.append(dhash(frame) if ret else None)
+    else:
+        all_hashes = []
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            all_hashes.append(dhash(frame))
+        total = len(all_hashes)
+        hashes = [all_hashes[int((i + 0.5) * total / samples)] if total else None for i in range(samples)]
+    cap.release()
+
+    duration = total / fps if fps > 0 else 0.0
+    return hashes, duration
+
+
+def analysis_key(user_id, test_type, height_cm=170):
+    # Duplicates only count within one athlete's own uploads. Jump height also
+    # depends on the athlete's height, other scores only on the video.
+    test_key = f"jump:{float(height_cm):.1f}" if test_type == "jump" else test_type
+    return f"{user_id}:{test_key}"
+
+
+def mean_distance(a, b):
+    pairs = [(x, y) for x, y in zip(a, b) if x is not None and y is not None]
+    if not pairs:
+        return 64
+    return sum(bin(x ^ y).count("1") for x, y in pairs) / len(pairs)
+
+
+def _band_keys(key, hashes):
+    for sample, h in enumerate(hashes):
+        if h is None:
+            continue
+        for band in range(BANDS):
+            yield key, sample, band, (h >> (band * BAND_BITS)) & ((1 << BAND_BITS) - 1)
+
+
+def _add(entry):
+    entry_id = len(_entries)
+    _entries.append(entry)
+    for bucket in _band_keys(entry["analysis_key"], entry["hashes"]):
+        _buckets.setdefault(bucket, []).append(entry_id)
+
+
+def _sync():
+    # Pull rows saved since the last sync, including ones from the other
+    # process (app.py and api.py both analyze), before every lookup
+    global _last_row_id
+    for row in load_fingerprints(after_id=_last_row_id):
+        _last_row_id = max(_last_row_id, row["id"])
+        _add({
+            "analysis_key": row["analysis_key"],
+            "video_path": row["video_path"],
+            "hashes": json.loads(row["frame_hashes"]),
+            "duration_sec": row["duration_sec"] or 0.0,
+            "result": json.loads(row["result_json"]),
+            "findings": row["findings"],
+            "model_tier": row["model_tier"],
+        })
+
+
+def find_duplicate(key, hashes, duration_sec):
+    """
+    Return the cached entry for a near-duplicate of `hashes`, or None.
+
+    Only entries sharing an exact 16-bit band with one of the sampled frames
+    are compared, so lookup cost follows bucket size rather than archive size.
+    A frame within 3 bits of its counterpart always shares at least one band.
+    Clips of unknown or different length never match.
+    """
+    if duration_sec <= 0:
+        return None
+    with _lock:
+        _sync()
+        candidates = set()
+        for bucket in _band_keys(key, hashes):
+            candidates.update(_buckets.get(bucket, ()))
+
+        best, best_distance = None, MAX_MEAN_DISTANCE
+        for entry_id in candidates:
+            if abs(_entries[entry_id]["duration_sec"] - duration_sec) > DURATION_TOLERANCE_SEC:
+                continue
+            distance = mean_distance(hashes, _entries[entry_id]["hashes"])
+            if distance <= best_distance:
+                best, best_distance = _entries[entry_id], distance
+        return dict(best) if best else None
+
+
+def remember_result(key, hashes, duration_sec, video_path, result, findings, model_tier):
+    save_fingerprint(key, video_path, json.dumps(hashes), duration_sec, json.dumps(result), findings, model_tier)
+    # The new row is indexed from the database, like rows saved by the other process
+    with _lock:
+        _sync()
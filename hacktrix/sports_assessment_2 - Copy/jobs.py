@@ -0,0 +1,122 @@
+import asyncio
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from admission import CPU_SLOTS, MAX_QUEUE, admission
+from analysis import check_duplicate, run_analysis
+
+# Finished jobs are kept this long so clients can still poll them
+JOB_TTL_SEC = 3600
+
+# One worker per reserved queue place plus one per running slot, so every
+# accepted job has a thread waiting in the admission queue
+_executor = ThreadPoolExecutor(max_workers=MAX_QUEUE + CPU_SLOTS, thread_name_prefix="analysis")
+_jobs = {}
+_waiters = {}  # job_id -> [(loop, asyncio.Event)]
+_lock = threading.Lock()
+
+
+def create_job(user_id, test_type, video_path):
+    job_id = uuid.uuid4().hex
+    job = {
+        "job_id": job_id,
+        "user_id": user_id,
+        "test_type": test_type,
+        "video_path": video_path,
+        "status": "queued",
+        "version": 0,
+        "created_at": time.time(),
+        "finished_at": None,
+        "findings": None,
+        "model_tier": None,
+        "error": None,
+    }
+    with _lock:
+        _prune_finished()
+        _jobs[job_id] = job
+    return job_id
+
+
+def get_job(job_id):
+    with _lock:
+        job = _jobs.get(job_id)
+        return dict(job) if job else None
+
+
+def update_job(job_id, **fields):
+    with _lock:
+        job = _jobs[job_id]
+        job.update(fields)
+        job["version"] += 1
+        if job["status"] in ("done", "failed"):
+            job["finished_at"] = time.time()
+        waiters = _waiters.pop(job_id, [])
+
+    # Waiters live on the API event loop, this may run on a worker thread
+    for loop, event in waiters:
+        loop.call_soon_threadsafe(event.set)
+
+
+async def wait_for_update(job_id, version, timeout):
+    """
+    Wait until the job's version moves past `version` or `timeout` expires.
+
+    Returns:
+        dict: Current job snapshot, or None if the job does not exist.
+    """
+    event = asyncio.Event()
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None or job["version"] != version:
+            return dict(job) if job else None
+        _waiters.setdefault(job_id, []).append((asyncio.get_running_loop(), event))
+
+    try:
+        await asyncio.wait_for(event.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        # Also runs when the client disconnects and the request is cancelled
+        with _lock:
+            waiters = [w for w in _waiters.get(job_id, []) if w[1] is not event]
+            if waiters:
+                _waiters[job_id] = waiters
+            else:
+                _waiters.pop(job_id, None)
+    return get_job(job_id)
+
+
+def submit_analysis(job_id, height_cm=170):
+    job = get_job(job_id)
+    return _executor.submit(_run_job, job_id, job["test_type"], job["video_path"], job["user_id"], height_cm)
+
+
+def _run_job(job_id, test_type, video_path, user_id, height_cm):
+    reserved = True  # queue place taken by submit_video
+    try:
+        # Duplicates are answered from the fingerprint cache without waiting for a slot
+        analysis, fingerprint = check_duplicate(test_type, video_path, user_id, height_cm)
+        if analysis is None:
+            # The queue place was reserved at submit time, so wait for a slot instead of timing out
+            reserved = False  # slot() takes the reservation over
+            with admission.slot(timeout=None, reserved=True):
+                update_job(job_id, status="running")
+                analysis = run_analysis(test_type, video_path, user_id, height_cm=height_cm,
+                                        fingerprint=fingerprint)
+    except Exception as exc:
+        traceback.print_exc()
+        update_job(job_id, status="failed", error=str(exc))
+        return
+    finally:
+        if reserved:
+            admission.cancel_reservation()
+    update_job(job_id, status="done", findings=analysis["findings"], model_tier=analysis["model_tier"])
+
+
+def _prune_finished():
+    cutoff = time.time() - JOB_TTL_SEC
+    for job_id in [j for j, job in _jobs.items() if job["finished_at"] and job["finished_at"] < cutoff]:
+        del _jobs[job_id]
+        _waiters.pop(job_id, None)
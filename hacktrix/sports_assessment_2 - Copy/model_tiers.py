@@ -0,0 +1,193 @@
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+import cv2
+import mediapipe as mp
+from admission import admission
+
+try:
+    import fcntl
+except ImportError:  # Windows: every process benchmarks on its own
+    fcntl = None
+
+# MediaPipe Pose model_complexity values
+MODEL_TIERS = {"lite": 0, "full": 1, "heavy": 2}
+MODEL_TIER_NAMES = {v: k for k, v in MODEL_TIERS.items()}
+DEFAULT_TIER = "full"
+
+# Where to look for a benchmark clip when REFERENCE_CLIP is not set
+REFERENCE_CLIP_DIRS = ("storage/proxies", "storage/uploads", "static/uploads")
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".mkv", ".webm")
+
+# Every process on the host (app.py, api.py, the debug reloader) reads the
+# same result, so the tiers are benchmarked once and all pick from one set of numbers
+BENCHMARK_FILE = os.environ.get("TIER_BENCHMARK_FILE",
+                                os.path.join(tempfile.gettempdir(), "sports_assessment_tier_fps.json"))
+BENCHMARK_MAX_AGE_SEC = 7 * 86400
+
+_tier_fps = {}
+_lock = threading.Lock()
+
+
+def benchmark_tiers(reference_clip, max_frames=60):
+    """
+    Measure pose-estimation throughput of every model tier on a reference clip.
+
+    Args:
+        reference_clip (str): Path to a short video used as the benchmark.
+        max_frames (int): Number of frames to process per tier.
+
+    Returns:
+        dict: {"lite": fps, "full": fps, "heavy": fps}
+    """
+    cap = cv2.VideoCapture(reference_clip)
+    frames = []
+    while cap.isOpened() and len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    cap.release()
+
+    if not frames:
+        print(f"⚠️ Benchmark skipped, could not read {reference_clip}")
+        return {}
+
+    measured = {}
+    for tier, complexity in MODEL_TIERS.items():
+        with mp.solutions.pose.Pose(model_complexity=complexity,
+                                    min_detection_confidence=0.5,
+                                    min_tracking_confidence=0.5) as pose:
+            pose.process(frames[0])  # warm-up, loads the model
+            start = time.perf_counter()
+            for image in frames:
+                pose.process(image)
+            elapsed = time.perf_counter() - start
+        measured[tier] = len(frames) / elapsed if elapsed > 0 else 0.0
+
+    _set_tier_fps(measured)
+    print("✅ Model tier benchmark (fps):", {k: round(v, 1) for k, v in measured.items()})
+    return measured
+
+
+def _set_tier_fps(measured):
+    with _lock:
+        _tier_fps.clear()
+        _tier_fps.update(measured)
+
+
+def load_shared_benchmark(max_age_sec=BENCHMARK_MAX_AGE_SEC):
+    """Tier fps saved by an earlier benchmark on this host, or None if missing or stale."""
+    try:
+        if time.time() - os.path.getmtime(BENCHMARK_FILE) > max_age_sec:
+            return None
+        with open(BENCHMARK_FILE) as f:
+            measured = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return measured if isinstance(measured, dict) and set(measured) == set(MODEL_TIERS) else None
+
+
+def shared_benchmark(reference_clip=None, max_frames=60):
+    """
+    Use this host's benchmark result, running the benchmark first if no
+    process has yet. A file lock makes processes starting together wait for
+    one run instead of competing for CPU, and the run holds an admission
+    slot so it does not overlap more live jobs than the slots allow.
+
+    Returns:
+        dict: {"lite": fps, "full": fps, "heavy": fps}, empty if nothing could be measured.
+    """
+    with open(BENCHMARK_FILE + ".lock", "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)  # released when the file closes
+
+        measured = load_shared_benchmark()
+        if measured:
+            _set_tier_fps(measured)
+            print("✅ Model tier benchmark loaded (fps):", {k: round(v, 1) for k, v in measured.items()})
+            return measured
+
+        clip = reference_clip or default_reference_clip()
+        if clip is None:
+            print(f"⚠️ No reference clip found, using the {DEFAULT_TIER} model for every job")
+            return {}
+        with admission.slot(timeout=None):
+            measured = benchmark_tiers(clip, max_frames)
+        if measured:
+            tmp = f"{BENCHMARK_FILE}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(measured, f)
+            os.replace(tmp, BENCHMARK_FILE)
+        return measured
+
+
+def default_reference_clip():
+    """
+    The REFERENCE_CLIP env var if set, otherwise the most recent stored video
+    (proxies first, since that is what analysis decodes). None if there is none.
+    """
+    clip = os.environ.get("REFERENCE_CLIP")
+    if clip and os.path.exists(clip):
+        return clip
+    for directory in REFERENCE_CLIP_DIRS:
+        videos = [p for p in glob.glob(os.path.join(directory, "*")) if p.lower().endswith(VIDEO_EXTENSIONS)]
+        if videos:
+            return max(videos, key=os.path.getmtime)
+    return None
+
+
+def start_benchmark(reference_clip=None, max_frames=60):
+    """Load or run the host-wide benchmark in the background; until then every job runs DEFAULT_TIER."""
+    thread = threading.Thread(target=shared_benchmark, args=(reference_clip, max_frames), daemon=True)
+    thread.start()
+    return thread
+
+
+def get_tier_fps():
+    with _lock:
+        return dict(_tier_fps)
+
+
+def count_frames(video_path):
+    cap = cv2.VideoCapture(video_path)
+    frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return max(frames, 0)
+
+
+def choose_tier(total_frames, latency_budget_sec=30.0, depth=None):
+    """
+    Pick the most accurate model tier that finishes within the latency budget.
+
+    Concurrent jobs share the CPU, so the measured fps of each tier is divided
+    by the number of jobs running or queued alongside this one. Heavy is
+    only considered when no other job is waiting or running.
+
+    Args:
+        total_frames (int): Frames in the video to analyze.
+        latency_budget_sec (float): Target wall-clock time for the analysis.
+        depth (int): Other jobs queued or running; defaults to the admission
+            controller's view (see AdmissionController.depth).
+
+    Returns:
+        str: "lite", "full" or "heavy".
+    """
+    tier_fps = get_tier_fps()
+    if not tier_fps:
+        return DEFAULT_TIER
+
+    if depth is None:
+        depth = admission.depth()
+
+    for tier in ("heavy", "full", "lite"):
+        if tier == "heavy" and depth > 0:
+            continue
+        fps = tier_fps.get(tier, 0) / (depth + 1)
+        if fps > 0 and total_frames / fps <= latency_budget_sec:
+            return tier
+    return "lite"
+
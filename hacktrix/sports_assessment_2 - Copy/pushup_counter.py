@@ -1,15 +1,17 @@
 import cv2
 import mediapipe as mp
 from db_utils import save_pushup_result
+from model_tiers import MODEL_TIER_NAMES
+from scoring import PushupScorer
 
-def analyze_pushups(video_path, user_id=1, show_video=True):
+def analyze_pushups(video_path, user_id=1, show_video=True, model_complexity=1, save_as=None):
     mp_pose = mp.solutions.pose
     mp_drawing = mp.solutions.drawing_utils
-    pose = mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5)
+    pose = mp_pose.Pose(model_complexity=model_complexity, min_detection_confidence=0.5, min_tracking_confidence=0.5)
 
     cap = cv2.VideoCapture(video_path)
+    scorer = PushupScorer()
     counter = 0
-    stage = None
 
     while cap.isOpened():
         ret, frame = cap.read()
@@ -20,15 +22,7 @@ def analyze_pushups(video_path, user_id=1, show_video=True):
         results = pose.process(image)
 
         if results.pose_landmarks:
-            landmarks = results.pose_landmarks.landmark
-            shoulder_y = landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER.value].y
-            elbow_y = landmarks[mp_pose.PoseLandmark.LEFT_ELBOW.value].y
-
-            if shoulder_y > elbow_y:
-                stage = "down"
-            if shoulder_y < elbow_y and stage == "down":
-                stage = "up"
-                counter += 1
+            counter = scorer.update(results.pose_landmarks.landmark)
 
             mp_drawing.draw_landmarks(frame, results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
 
@@ -44,6 +38,6 @@ def analyze_pushups(video_path, user_id=1, show_video=True):
         cv2.destroyAllWindows()
 
     print(f"✅ Total Push-ups: {counter}")
-    save_pushup_result(user_id, video_path, counter)
+    save_pushup_result(user_id, save_as or video_path, counter, model_tier=MODEL_TIER_NAMES[model_complexity])
     return counter
 
@@ -0,0 +1,137 @@
+import argparse
+import gzip
+import json
+from scoring import JumpScorer, Landmark, PunchScorer, PushupScorer
+
+# Record/replay of pose landmark streams.
+#
+#   python replay.py record static/uploads/clip.mp4 fixtures/clip.json.gz
+#   python replay.py replay fixtures/clip.json.gz punches --punch-threshold 0.04
+#   python -m pytest tests    # replays tests/fixtures against known scores
+#
+# A fixture holds the raw landmarks MediaPipe produced for every frame. Replay
+# feeds them through the scorers in scoring.py with no model, no video decode
+# and no database, so scoring thresholds can be tuned and tested in CI.
+
+FIXTURE_VERSION = 1
+
+
+def record_landmarks(video_path, fixture_path, model_complexity=1):
+    """
+    Run pose estimation over a video and save the landmark stream as a gzipped JSON fixture.
+
+    Like production, the analysis proxy is decoded when one can be built, so
+    replayed scores match what run_analysis() saves.
+
+    Returns:
+        dict: The fixture that was written.
+    """
+    # Only recording needs the model, replay works without OpenCV or MediaPipe installed
+    import cv2
+    import mediapipe as mp
+    from storage import analysis_source
+
+    source = analysis_source(video_path)
+    pose = mp.solutions.pose.Pose(model_complexity=model_complexity,
+                                  min_detection_confidence=0.5, min_tracking_confidence=0.5)
+    cap = cv2.VideoCapture(source)
+    fixture = {
+        "version": FIXTURE_VERSION,
+        "source": video_path,
+        "model_complexity": model_complexity,
+        "fps": int(cap.get(cv2.CAP_PROP_FPS)),
+        "frame_count": int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+        "frames": [],
+    }
+
+    while cap.isOpened():
+        ret, frame = cap.read()
+        if not ret:
+            break
+        results = pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        if results.pose_landmarks:
+            fixture["frames"].append([[round(lm.x, 5), round(lm.y, 5), round(lm.z, 5), round(lm.visibility, 3)]
+                                      for lm in results.pose_landmarks.landmark])
+        else:
+            fixture["frames"].append(None)
+
+    cap.release()
+    pose.close()
+
+    with gzip.open(fixture_path, "wt", encoding="utf-8") as f:
+        json.dump(fixture, f, separators=(",", ":"))
+    print(f"✅ Recorded {len(fixture['frames'])} frames to {fixture_path}")
+    return fixture
+
+
+def load_fixture(fixture_path):
+    with gzip.open(fixture_path, "rt", encoding="utf-8") as f:
+        fixture = json.load(f)
+    if fixture.get("version") != FIXTURE_VERSION:
+        raise ValueError(f"Unsupported fixture version {fixture.get('version')} in {fixture_path}")
+    fixture["frames"] = [[Landmark(*lm) for lm in frame] if frame else None for frame in fixture["frames"]]
+    return fixture
+
+
+def replay(fixture, test_type, user_height_cm=170, hand="RIGHT", punch_threshold=0.05, reset_threshold=0.01):
+    """
+    Score a recorded landmark stream exactly like the video analyzers do.
+
+    Args:
+        fixture (dict/str): A loaded fixture or a path to one. Load once and
+            pass the dict when replaying many parameter sets.
+        test_type (str): "pushups", "jump" or "punches".
+
+    Returns:
+        int/float/dict: Same value the matching analyze_* function returns,
+        without the model_tier key for punches. Nothing is saved.
+    """
+    if isinstance(fixture, str):
+        fixture = load_fixture(fixture)
+
+    if test_type == "pushups":
+        scorer = PushupScorer()
+    elif test_type == "jump":
+        scorer = JumpScorer(user_height_cm)
+    else:
+        scorer = PunchScorer(hand, punch_threshold, reset_threshold)
+
+    for landmarks in fixture["frames"]:
+        # The analyzers skip frames without a detection, so do the same
+        if landmarks is not None:
+            scorer.update(landmarks)
+
+    if test_type == "punches":
+        fps = fixture["fps"]
+        return scorer.result(fixture["frame_count"] / fps if fps > 0 else 0)
+    return scorer.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record or replay pose landmark fixtures")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rec = sub.add_parser("record", help="run pose estimation on a video and save its landmarks")
+    rec.add_argument("video_path")
+    rec.add_argument("fixture_path")
+    rec.add_argument("--model-complexity", type=int, default=1, choices=(0, 1, 2))
+
+    rep = sub.add_parser("replay", help="score a recorded fixture without the model or database")
+    rep.add_argument("fixture_path")
+    rep.add_argument("test_type", choices=("pushups", "jump", "punches"))
+    rep.add_argument("--height-cm", type=float, default=170)
+    rep.add_argument("--hand", default="RIGHT")
+    rep.add_argument("--punch-threshold", type=float, default=0.05)
+    rep.add_argument("--reset-threshold", type=float, default=0.01)
+
+    args = parser.parse_args()
+    if args.command == "record":
+        record_landmarks(args.video_path, args.fixture_path, args.model_complexity)
+    else:
+        result = replay(args.fixture_path, args.test_type, user_height_cm=args.height_cm, hand=args.hand,
+                        punch_threshold=args.punch_threshold, reset_threshold=args.reset_threshold)
+        print("✅ Replay result:", result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+from collections import namedtuple
+from enum import IntEnum
+
+# Scoring state machines, fed one frame of pose landmarks at a time.
+# `landmarks` is indexable by PoseLandmark and each item has .x/.y, so
+# MediaPipe results and plain tuples (squad crops, replays) both work.
+# No MediaPipe import here, so recorded fixtures can be scored without it.
+Landmark = namedtuple("Landmark", ["x", "y", "z", "visibility"])
+
+
+class PoseLandmark(IntEnum):
+    # Same indices as mediapipe.solutions.pose.PoseLandmark
+    LEFT_SHOULDER = 11
+    LEFT_ELBOW = 13
+    LEFT_WRIST = 15
+    RIGHT_WRIST = 16
+    LEFT_ANKLE = 27
+
+
+class PushupScorer:
+    def __init__(self):
+        self.counter = 0
+        self.stage = None
+
+    def update(self, landmarks):
+        if landmarks is None:
+            return self.counter
+        shoulder_y = landmarks[PoseLandmark.LEFT_SHOULDER.value].y
+        elbow_y = landmarks[PoseLandmark.LEFT_ELBOW.value].y
+
+        if shoulder_y > elbow_y:
+            self.stage = "down"
+        if shoulder_y < elbow_y and self.stage == "down":
+            self.stage = "up"
+            self.counter += 1
+        return self.counter
+
+    def result(self):
+        return self.counter
+
+
+class JumpScorer:
+    def __init__(self, user_height_cm=170):
+        self.user_height_cm = user_height_cm
+        # Running ground/apex and body-height sum, so each frame is O(1)
+        self.ground, self.apex = None, None
+        self.body_height_sum, self.samples = 0.0, 0
+        self.jump_cm = 0.0
+
+    def update(self, landmarks):
+        if landmarks is None:
+            return self.jump_cm
+        shoulder_y = landmarks[PoseLandmark.LEFT_SHOULDER].y
+        ankle_y = landmarks[PoseLandmark.LEFT_ANKLE].y
+
+        self.ground = shoulder_y if self.ground is None else max(self.ground, shoulder_y)
+        self.apex = shoulder_y if self.apex is None else min(self.apex, shoulder_y)
+        self.body_height_sum += ankle_y - shoulder_y
+        self.samples += 1
+        self.jump_cm = self._jump_cm(self.user_height_cm)
+        return self.jump_cm
+
+    def _jump_cm(self, user_height_cm):
+        jump_norm = self.ground - self.apex
+        avg_body_norm = self.body_height_sum / self.samples
+        if not avg_body_norm:
+            return 0.0
+        scaling_factor = user_height_cm / avg_body_norm
+        return jump_norm * scaling_factor - user_height_cm
+
+    def result(self, user_height_cm=None):
+        # The athlete's height may only be known after tracking (squad mode)
+        if user_height_cm is None or not self.samples:
+            return abs(self.jump_cm)
+        return abs(self._jump_cm(user_height_cm))
+
+
+class PunchScorer:
+    def __init__(self, hand="RIGHT", punch_threshold=0.05, reset_threshold=0.01):
+        self.wrist_index = PoseLandmark.LEFT_WRIST if hand.upper() == "LEFT" else PoseLandmark.RIGHT_WRIST
+        self.punch_threshold = punch_threshold
+        self.reset_threshold = reset_threshold
+        self.punch_count, self.prev_x, self.punching = 0, None, False
+
+    def update(self, landmarks, scale=1.0):
+        """
+        `scale` is the width of the athlete's view as a fraction of the frame.
+        Thresholds are tuned for one athlete filling the frame, so squad
+        crops pass their crop width to measure speed relative to the athlete.
+        """
+        if landmarks is None:
+            self.prev_x = None  # don't measure speed across a gap
+            return self.punch_count
+        x = landmarks[self.wrist_index].x
+
+        if self.prev_x is not None:
+            speed = abs(x - self.prev_x) / scale
+            if speed > self.punch_threshold and not self.punching:
+                self.punch_count += 1
+                self.punching = True
+            elif speed < self.reset_threshold:
+                self.punching = False
+        self.prev_x = x
+        return self.punch_count
+
+    def result(self, duration):
+        punches_per_sec = self.punch_count / duration if duration > 0 else 0
+        punches_per_min = punches_per_sec * 60 if duration > 0 else 0
+        return {
+            "total_punches": self.punch_count,
+            "duration_sec": duration,
+            "punches_per_sec": punches_per_sec,
+            "punches_per_min": punches_per_min
+        }
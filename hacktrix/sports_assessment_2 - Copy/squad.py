@@ -0,0 +1,266 @@
+import cv2
+import mediapipe as mp
+from db_utils import get_users, save_squad_results
+from model_tiers import MODEL_TIER_NAMES
+from scoring import JumpScorer, Landmark, PunchScorer, PushupScorer
+
+DETECT_EVERY = 5  # run the person detector every N frames, follow pose boxes in between
+DETECT_WIDTH = 640
+CROP_MARGIN = 0.2
+MATCH_IOU = 0.3
+MAX_MISSES = 15
+MIN_TRACK_FRAMES = 15
+# New athletes are only picked up in the opening seconds, while everyone stands
+# upright: the HOG detector only finds upright people, so it cannot seed a
+# track on someone already in a push-up plank. Pose tracking follows them after.
+SEED_SEC = 3.0
+# A lost track is revived by a detection this close (in widths of its last box)
+REID_MAX_DIST = 0.75
+REID_MAX_GAP_SEC = 5.0
+
+
+class SquadMismatch(Exception):
+    def __init__(self, tracked, roster):
+        super().__init__(f"Found {tracked} athletes in the video but the roster has {roster}")
+        self.tracked = tracked
+        self.roster = roster
+
+
+class InvalidRoster(ValueError):
+    pass
+
+
+def check_roster(user_ids):
+    """
+    Validate a squad roster before the upload is saved or analyzed.
+
+    Returns:
+        dict: user_id -> height_cm for every athlete (170 if unknown).
+
+    Raises:
+        InvalidRoster: The roster is empty, lists an ID twice, or names a
+            user that does not exist or is not a Player.
+    """
+    if not user_ids:
+        raise InvalidRoster("Enter at least one athlete ID")
+    repeated = sorted({u for u in user_ids if user_ids.count(u) > 1})
+    if repeated:
+        raise InvalidRoster(f"Athlete IDs listed more than once: {', '.join(map(str, repeated))}")
+    users = get_users(user_ids)
+    unknown = [u for u in user_ids if u not in users]
+    if unknown:
+        raise InvalidRoster(f"No user with ID {', '.join(map(str, unknown))}")
+    not_players = [u for u in user_ids if users[u]["role"] != "Player"]
+    if not_players:
+        raise InvalidRoster(f"Not a Player account: {', '.join(map(str, not_players))}")
+    return {u: users[u]["height_cm"] or 170 for u in user_ids}
+
+
+def iou(a, b):
+    ax0, ay0, ax1, ay1 = a
+    bx0, by0, bx1, by1 = b
+    iw = max(0, min(ax1, bx1) - max(ax0, bx0))
+    ih = max(0, min(ay1, by1) - max(ay0, by0))
+    inter = iw * ih
+    union = (ax1 - ax0) * (ay1 - ay0) + (bx1 - bx0) * (by1 - by0) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def detect_people(hog, frame):
+    """Person boxes (x0, y0, x1, y1) in frame pixels from OpenCV's HOG people detector."""
+    h, w = frame.shape[:2]
+    scale = min(1.0, DETECT_WIDTH / w)
+    small = cv2.resize(frame, (int(w * scale), int(h * scale))) if scale < 1.0 else frame
+    rects, _ = hog.detectMultiScale(small, winStride=(8, 8), padding=(8, 8), scale=1.05)
+    return [(int(x / scale), int(y / scale), int((x + rw) / scale), int((y + rh) / scale)) for x, y, rw, rh in rects]
+
+
+def expand_box(box, w, h, margin=CROP_MARGIN):
+    x0, y0, x1, y1 = box
+    mx, my = (x1 - x0) * margin, (y1 - y0) * margin
+    return max(0, int(x0 - mx)), max(0, int(y0 - my)), min(w, int(x1 + mx)), min(h, int(y1 + my))
+
+
+class Track:
+    def __init__(self, track_id, box, scorer, model_complexity):
+        self.track_id = track_id
+        self.box = box
+        self.scorer = scorer
+        self.first_x = (box[0] + box[2]) / 2
+        self.frames = 0
+        self.misses = 0
+        self.lost_at = None
+        self.model_complexity = model_complexity
+        self.pose = None
+        self.crop_scale = 1.0  # crop width / frame width, for scale-dependent scorers
+
+    def center(self):
+        return (self.box[0] + self.box[2]) / 2, (self.box[1] + self.box[3]) / 2
+
+    def process(self, frame_rgb):
+        """Run pose on this track's crop and return landmarks in full-frame coordinates."""
+        h, w = frame_rgb.shape[:2]
+        x0, y0, x1, y1 = expand_box(self.box, w, h)
+        if x1 - x0 < 16 or y1 - y0 < 16:
+            return None
+        if self.pose is None:
+            # One tracking-mode Pose per athlete keeps MediaPipe's temporal smoothing per person
+            self.pose = mp.solutions.pose.Pose(model_complexity=self.model_complexity,
+                                               min_detection_confidence=0.5, min_tracking_confidence=0.5)
+        results = self.pose.process(frame_rgb[y0:y1, x0:x1])
+        if not results.pose_landmarks:
+            return None
+        cw, ch = x1 - x0, y1 - y0
+        self.crop_scale = cw / w
+        landmarks = [Landmark((lm.x * cw + x0) / w, (lm.y * ch + y0) / h, lm.z, lm.visibility)
+                     for lm in results.pose_landmarks.landmark]
+        # Follow the athlete between detector runs using the visible landmarks
+        xs = [lm.x * w for lm in landmarks if lm.visibility > 0.5]
+        ys = [lm.y * h for lm in landmarks if lm.visibility > 0.5]
+        if xs and ys:
+            self.box = (int(min(xs)), int(min(ys)), int(max(xs)), int(max(ys)))
+        return landmarks
+
+    def close(self):
+        # Frees the MediaPipe graph; process() opens a new one if the track is revived
+        if self.pose is not None:
+            self.pose.close()
+            self.pose = None
+
+
+def _make_scorer(test_type):
+    if test_type == "pushups":
+        return PushupScorer()
+    if test_type == "jump":
+        return JumpScorer()
+    return PunchScorer("RIGHT")
+
+
+def _revive(lost, box, frame_index, max_gap):
+    """Nearest recently lost track whose last position is close to `box`, or None."""
+    cx, cy = (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+    best, best_dist = None, None
+    for track in lost:
+        if frame_index - track.lost_at > max_gap:
+            continue
+        tx, ty = track.center()
+        dist = ((cx - tx) ** 2 + (cy - ty) ** 2) ** 0.5
+        if dist <= REID_MAX_DIST * max(track.box[2] - track.box[0], 1) and (best is None or dist < best_dist):
+            best, best_dist = track, dist
+    return best
+
+
+def analyze_squad(video_path, test_type, user_ids, heights_cm=None, model_complexity=1, save_as=None):
+    """
+    Score every athlete in a group video.
+
+    Record the squad standing upright in roster order, left to right, for
+    the first few seconds (SEED_SEC): athletes are only detected then, and
+    tracks are mapped to `user_ids` by where each was first seen. For push-ups
+    start standing and drop into the plank afterwards. An athlete lost for a
+    moment is re-attached to their own track by position. Short-lived tracks
+    (false detections, people walking through) are dropped.
+
+    Args:
+        video_path (str): Video to decode.
+        test_type (str): "pushups", "jump" or "punches".
+        user_ids (list): Roster, left to right.
+        heights_cm (dict): user_id -> height, used for the jump test.
+        model_complexity (int): MediaPipe Pose model tier.
+        save_as (str): Path recorded with the results, defaults to video_path.
+
+    Returns:
+        list: [{"user_id", "track_id", "frames", "result"}] in roster order.
+
+    Raises:
+        SquadMismatch: The number of tracked athletes differs from the roster;
+            nothing is saved rather than saving scores against the wrong users.
+            The results are saved in one transaction, so a failed save also leaves nothing behind.
+    """
+    heights_cm = heights_cm or {}
+    hog = cv2.HOGDescriptor()
+    hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
+
+    cap = cv2.VideoCapture(video_path)
+    fps = int(cap.get(cv2.CAP_PROP_FPS))
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    duration = total_frames / fps if fps > 0 else 0
+    seed_frames = int(SEED_SEC * (fps or 30))
+    reid_gap_frames = int(REID_MAX_GAP_SEC * (fps or 30))
+
+    active, lost, finished = [], [], []
+    next_id, frame_index = 0, 0
+
+    while cap.isOpened():
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+        if frame_index % DETECT_EVERY == 0:
+            # Greedy IoU matching of detections to existing tracks. Detector boxes
+            # are padded, so compare against the padded pose box.
+            h, w = frame.shape[:2]
+            unmatched = detect_people(hog, frame)
+            for track in sorted(active, key=lambda t: t.misses):
+                padded = expand_box(track.box, w, h)
+                best = max(unmatched, key=lambda box: iou(padded, box), default=None)
+                if best is not None and iou(padded, best) >= MATCH_IOU:
+                    track.box = best
+                    unmatched.remove(best)
+            for box in unmatched:
+                revived = _revive(lost, box, frame_index, reid_gap_frames)
+                if revived is not None:
+                    lost.remove(revived)
+                    revived.box, revived.misses, revived.lost_at = box, 0, None
+                    active.append(revived)
+                elif frame_index < seed_frames:
+                    active.append(Track(next_id, box, _make_scorer(test_type), model_complexity))
+                    next_id += 1
+
+        for track in active:
+            landmarks = track.process(frame_rgb)
+            if test_type == "punches":
+                # Landmarks are in full-frame units; punch speed is judged relative to the athlete's crop
+                track.scorer.update(landmarks, scale=track.crop_scale)
+            else:
+                track.scorer.update(landmarks)
+            if landmarks is None:
+                track.misses += 1
+            else:
+                track.misses = 0
+                track.frames += 1
+
+        for track in [t for t in active if t.misses > MAX_MISSES]:
+            active.remove(track)
+            track.close()
+            track.lost_at = frame_index
+            lost.append(track)
+        for track in [t for t in lost if frame_index - t.lost_at > reid_gap_frames]:
+            lost.remove(track)
+            finished.append(track)
+        frame_index += 1
+
+    cap.release()
+    finished.extend(active + lost)
+    for track in finished:
+        track.close()
+
+    tracks = sorted((t for t in finished if t.frames >= MIN_TRACK_FRAMES), key=lambda t: t.first_x)
+    if len(tracks) != len(user_ids):
+        raise SquadMismatch(len(tracks), len(user_ids))
+    results = []
+    for user_id, track in zip(user_ids, tracks):
+        if test_type == "pushups":
+            result = track.scorer.result()
+        elif test_type == "jump":
+            result = track.scorer.result(heights_cm.get(user_id, 170))
+        else:
+            result = track.scorer.result(duration)
+        results.append({"user_id": user_id, "track_id": track.track_id, "frames": track.frames, "result": result})
+
+    save_squad_results(test_type, save_as or video_path, [(r["user_id"], r["result"]) for r in results],
+                       model_tier=MODEL_TIER_NAMES[model_complexity])
+
+    print(f"✅ Squad analysis: {len(tracks)} athletes tracked, {len(results)} mapped to users")
+    return results
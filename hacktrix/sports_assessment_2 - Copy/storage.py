@@ -0,0 +1,256 @@
+import gzip
+import os
+import shutil
+import subprocess
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import cv2
+from werkzeug.utils import secure_filename
+from db_utils import rename_video_paths
+
+# Uploads live outside static/ so they are no longer served as public files
+STORAGE_ROOT = os.environ.get("STORAGE_ROOT", "storage")
+UPLOAD_DIR = os.path.join(STORAGE_ROOT, "uploads")
+PROXY_DIR = os.path.join(STORAGE_ROOT, "proxies")
+ARCHIVE_DIR = os.path.join(STORAGE_ROOT, "archive")
+LEGACY_UPLOAD_DIR = os.path.join("static", "uploads")
+
+# Analysis proxy: small, constant frame rate, a keyframe every half second.
+# The source frame rate is kept on purpose: punch scoring thresholds are
+# per-frame wrist displacements, so resampling would change punch counts.
+PROXY_HEIGHT = 360
+PROXY_KEYFRAME_SEC = 0.5
+
+RETENTION_DAYS = float(os.environ.get("UPLOAD_RETENTION_DAYS", 30))
+QUOTA_BYTES = int(float(os.environ.get("STORAGE_QUOTA_GB", 20)) * 1024 ** 3)
+MAINTENANCE_INTERVAL_SEC = 3600
+
+for _d in (UPLOAD_DIR, PROXY_DIR, ARCHIVE_DIR):
+    os.makedirs(_d, exist_ok=True)
+
+# ffmpeg is multi-threaded already, one transcode at a time keeps CPU for analysis
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="transcode")
+_pending = {}
+_lock = threading.Lock()
+
+
+def new_upload_path(filename):
+    """Unique, sanitized path for a new upload, so no upload ever reuses another's name or proxy."""
+    stem, ext = os.path.splitext(secure_filename(filename or "") or "video.mp4")
+    return os.path.join(UPLOAD_DIR, f"{stem}_{uuid.uuid4().hex[:8]}{ext}")
+
+
+def proxy_path_for(video_path):
+    # Full file name, so clip.mov and clip.mp4 get different proxies
+    return os.path.join(PROXY_DIR, os.path.basename(video_path) + ".mp4")
+
+
+def proxy_is_current(video_path):
+    """True if the proxy exists and was built after the original was last written."""
+    proxy = proxy_path_for(video_path)
+    if not os.path.exists(proxy):
+        return False
+    return not os.path.exists(video_path) or os.path.getmtime(proxy) >= os.path.getmtime(video_path)
+
+
+def archive_path_for(video_path):
+    return os.path.join(ARCHIVE_DIR, os.path.basename(video_path) + ".gz")
+
+
+def is_stored(video_path):
+    """True if the upload is still available as an original, proxy or archive."""
+    return any(os.path.exists(p) for p in (video_path, proxy_path_for(video_path), archive_path_for(video_path)))
+
+
+def transcode_proxy(src, dst):
+    # Unique temp name: a job may build its proxy inline while ingest queues another
+    tmp = f"{dst}.{uuid.uuid4().hex[:8]}.part.mp4"
+    if shutil.which("ffmpeg"):
+        subprocess.run(
+            ["ffmpeg", "-y", "-loglevel", "error", "-i", src,
+             "-vf", f"scale=-2:{PROXY_HEIGHT}", "-vsync", "cfr",
+             "-c:v", "libx264", "-preset", "veryfast", "-crf", "28",
+             "-force_key_frames", f"expr:gte(t,n_forced*{PROXY_KEYFRAME_SEC})",
+             "-sc_threshold", "0", "-an", "-movflags", "+faststart", tmp],
+            check=True
+        )
+    else:
+        _transcode_with_opencv(src, tmp)
+    os.replace(tmp, dst)
+    return dst
+
+
+def _transcode_with_opencv(src, dst):
+    # Fallback without ffmpeg: resize only, every decoded frame is written at
+    # the source frame rate. Keyframe spacing cannot be controlled here.
+    cap = cv2.VideoCapture(src)
+    src_fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    writer = None
+    while cap.isOpened():
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if writer is None:
+            h, w = frame.shape[:2]
+            size = (int(round(w * PROXY_HEIGHT / h / 2)) * 2, PROXY_HEIGHT)
+            writer = cv2.VideoWriter(dst, cv2.VideoWriter_fourcc(*"mp4v"), src_fps, size)
+        writer.write(cv2.resize(frame, size, interpolation=cv2.INTER_AREA))
+    cap.release()
+    if writer is None:
+        raise ValueError(f"Could not read any frames from {src}")
+    writer.release()
+
+
+def _transcode_job(video_path):
+    try:
+        return transcode_proxy(video_path, proxy_path_for(video_path))
+    finally:
+        with _lock:
+            _pending.pop(video_path, None)
+
+
+def ingest_upload(video_path):
+    """Start building the analysis proxy for a freshly saved upload in the background."""
+    with _lock:
+        if video_path not in _pending and not proxy_is_current(video_path):
+            _pending[video_path] = _executor.submit(_transcode_job, video_path)
+        return _pending.get(video_path)
+
+
+def analysis_source(video_path, timeout=120):
+    """
+    Path to decode for analysis: the proxy if it is ready or can be built,
+    otherwise the original upload.
+
+    Called from inside an admission slot, so the job never idles behind
+    other uploads' transcodes: if its own background transcode has not
+    started yet it is cancelled and the proxy is built in this thread.
+    A transcode that is already running is waited on for up to `timeout` seconds.
+    """
+    if proxy_is_current(video_path):
+        return proxy_path_for(video_path)
+    if not os.path.exists(video_path):
+        return video_path
+
+    with _lock:
+        future = _pending.get(video_path)
+        inline = future is None or future.cancel()
+        if inline:
+            _pending.pop(video_path, None)
+    try:
+        if inline:
+            return transcode_proxy(video_path, proxy_path_for(video_path))
+        return future.result(timeout=timeout)
+    except FutureTimeout:
+        print(f"⚠️ Proxy for {video_path} still transcoding after {timeout}s, decoding the original")
+    except Exception as exc:
+        print(f"⚠️ Proxy transcode failed for {video_path}: {exc}")
+    return video_path
+
+
+def discard_upload(video_path):
+    """Delete an upload and anything derived from it (used for duplicates)."""
+    with _lock:
+        future = _pending.get(video_path)
+    if future is not None:
+        future.cancel()
+        try:
+            future.result()
+        except Exception:
+            pass
+    for path in (video_path, proxy_path_for(video_path)):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _files_by_age(directory):
+    paths = [os.path.join(directory, f) for f in os.listdir(directory)]
+    return sorted((p for p in paths if os.path.isfile(p)), key=os.path.getmtime)
+
+
+def archive_cold_uploads(retention_days=RETENTION_DAYS):
+    """Gzip originals older than the retention window into the archive; their proxy stays live."""
+    cutoff = time.time() - retention_days * 86400
+    archived = 0
+    for path in _files_by_age(UPLOAD_DIR):
+        if os.path.getmtime(path) >= cutoff:
+            break
+        if not os.path.exists(proxy_path_for(path)):
+            continue  # never drop the only analyzable copy
+        with open(path, "rb") as src, gzip.open(archive_path_for(path), "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(path)
+        archived += 1
+    return archived
+
+
+def storage_usage():
+    return sum(os.path.getsize(p) for d in (UPLOAD_DIR, PROXY_DIR, ARCHIVE_DIR) for p in _files_by_age(d))
+
+
+def enforce_quota(quota_bytes=QUOTA_BYTES):
+    """
+    Free space until usage fits the quota: oldest archives first, then the
+    oldest originals that already have a proxy. Proxies are never deleted.
+
+    Returns:
+        int: Bytes freed.
+    """
+    usage = storage_usage()
+    freed = 0
+    candidates = _files_by_age(ARCHIVE_DIR) + [p for p in _files_by_age(UPLOAD_DIR) if os.path.exists(proxy_path_for(p))]
+    for path in candidates:
+        if usage - freed <= quota_bytes:
+            break
+        size = os.path.getsize(path)
+        os.remove(path)
+        freed += size
+    if usage - freed > quota_bytes:
+        print(f"⚠️ Storage still over quota: {(usage - freed) / 1024 ** 3:.2f} GB")
+    return freed
+
+
+def migrate_legacy_uploads():
+    """
+    Move uploads saved under static/uploads by older versions into storage,
+    so they are no longer public and fall under retention and the quota.
+    Result rows are repointed at the new paths, and proxies are queued since
+    only uploads with a proxy can be archived.
+    """
+    if not os.path.isdir(LEGACY_UPLOAD_DIR):
+        return 0
+    moved = 0
+    for name in os.listdir(LEGACY_UPLOAD_DIR):
+        src = os.path.join(LEGACY_UPLOAD_DIR, name)
+        if not os.path.isfile(src):
+            continue
+        dst = os.path.join(UPLOAD_DIR, name)
+        shutil.move(src, dst)
+        ingest_upload(dst)
+        moved += 1
+    if moved:
+        rename_video_paths(LEGACY_UPLOAD_DIR + os.sep, UPLOAD_DIR + os.sep)
+    return moved
+
+
+def run_maintenance():
+    migrated = migrate_legacy_uploads()
+    archived = archive_cold_uploads()
+    freed = enforce_quota()
+    print(f"✅ Storage maintenance: migrated {migrated}, archived {archived} uploads, freed {freed / 1024 ** 2:.1f} MB")
+
+
+def start_maintenance_thread(interval_sec=MAINTENANCE_INTERVAL_SEC):
+    def loop():
+        while True:
+            try:
+                run_maintenance()
+            except Exception as exc:
+                print(f"⚠️ Storage maintenance failed: {exc}")
+            time.sleep(interval_sec)
+
+    thread = threading.Thread(target=loop, daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,43 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from replay import load_fixture, replay
+
+# Recorded with `python replay.py record` from the analysis proxy of
+# storage/uploads/WhatsApp Video 2025-09-06 at 18.27.42_18b85948.mp4.
+# Expected values are what the analyzers returned on that proxy.
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "sample_18b85948.json.gz")
+
+
+@pytest.fixture(scope="module")
+def fixture():
+    return load_fixture(FIXTURE)
+
+
+def test_fixture_shape(fixture):
+    assert fixture["fps"] == 24
+    assert fixture["frame_count"] == 73
+    assert len(fixture["frames"]) == 73
+
+
+def test_replay_pushups(fixture):
+    assert replay(fixture, "pushups") == 2
+
+
+def test_replay_jump(fixture):
+    # Landmarks are stored rounded to 5 decimals, so allow a little drift
+    assert replay(fixture, "jump", user_height_cm=170) == pytest.approx(24.50, abs=0.01)
+
+
+def test_replay_punches(fixture):
+    result = replay(fixture, "punches")
+    assert result["total_punches"] == 3
+    assert result["duration_sec"] == pytest.approx(73 / 24)
+    assert result["punches_per_min"] == pytest.approx(3 / (73 / 24) * 60)
+
+
+def test_replay_punch_threshold_sweep(fixture):
+    counts = [replay(fixture, "punches", punch_threshold=t)["total_punches"] for t in (0.02, 0.05, 0.5)]
+    assert counts[0] >= counts[1] >= counts[2] == 0
@@ -1,16 +1,16 @@
 import cv2
 import mediapipe as mp
-import numpy as np
 from db_utils import save_jump_result
+from model_tiers import MODEL_TIER_NAMES
+from scoring import JumpScorer
 
-def analyze_jump(video_path, user_height_cm=170, user_id=1, show_video=True):
+def analyze_jump(video_path, user_height_cm=170, user_id=1, show_video=True, model_complexity=1, save_as=None):
     mp_pose = mp.solutions.pose
     mp_drawing = mp.solutions.drawing_utils
-    pose = mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5)
+    pose = mp_pose.Pose(model_complexity=model_complexity, min_detection_confidence=0.5, min_tracking_confidence=0.5)
 
     cap = cv2.VideoCapture(video_path)
-    shoulder_positions, body_heights = [], []
-    ground, apex = None, None
+    scorer = JumpScorer(user_height_cm)
     jump_cm = 0.0
 
     while cap.isOpened():
@@ -22,19 +22,7 @@ def analyze_jump(video_path, user_height_cm=170, user_id=1, show_video=True):
         results = pose.process(frame_rgb)
 
         if results.pose_landmarks:
-            landmarks = results.pose_landmarks.landmark
-            shoulder_y = landmarks[mp_pose.PoseLandmark.LEFT_SHOULDER].y
-            ankle_y = landmarks[mp_pose.PoseLandmark.LEFT_ANKLE].y
-
-            shoulder_positions.append(shoulder_y)
-            body_heights.append(ankle_y - shoulder_y)
-
-            ground = max(shoulder_positions)
-            apex = min(shoulder_positions)
-            jump_norm = ground - apex
-            avg_body_norm = np.mean(body_heights) if body_heights else 1
-            scaling_factor = user_height_cm / avg_body_norm
-            jump_cm = jump_norm * scaling_factor - user_height_cm
+            jump_cm = scorer.update(results.pose_landmarks.landmark)
 
             if show_video:
                 mp_drawing.draw_landmarks(frame, results.pose_landmarks, mp_pose.POSE_CONNECTIONS)
@@ -51,6 +39,6 @@ def analyze_jump(video_path, user_height_cm=170, user_id=1, show_video=True):
         cv2.destroyAllWindows()
 
     print(f"✅ Vertical Jump Height: {abs(jump_cm):.2f} cm")
-    save_jump_result(user_id, video_path, abs(jump_cm))
+    save_jump_result(user_id, save_as or video_path, abs(jump_cm), model_tier=MODEL_TIER_NAMES[model_complexity])
     return abs(jump_cm)
 